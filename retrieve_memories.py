@@ -7,18 +7,268 @@ The memories are stored in the convex_local_backend.sqlite3 database with the fo
 - Table: documents - Convex stores data in a documents table with JSON format
 """
 
+import array
+import binascii
 import sqlite3
-import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import orjson
 import pandas as pd
+import simdjson
+from numba import njit, prange
 from typing import List, Dict, Any
-from datetime import datetime
+
+try:
+    import hyperscan
+except ImportError:
+    # Optional accelerator for the JSON-text fallback scans; without it the
+    # queries run on json_extract predicates alone.
+    hyperscan = None
 
 DB_PATH = "convex_local_backend.sqlite3"
 
+# Shape predicates identifying each logical Convex table by its fields.
+# Used to discover the table's table_id BLOB (see get_table_id) and as a
+# fallback filter when discovery finds no rows.
+_TABLE_PREDICATES = {
+    'memories': """json_extract(json_value, '$.importance') IS NOT NULL
+  AND json_extract(json_value, '$.description') IS NOT NULL
+  AND json_extract(json_value, '$.playerId') IS NOT NULL""",
+    'memoryEmbeddings': """json_extract(json_value, '$.embedding') IS NOT NULL
+  AND json_extract(json_value, '$.playerId') IS NOT NULL""",
+    'messages': """json_extract(json_value, '$.text') IS NOT NULL
+  AND json_extract(json_value, '$.author') IS NOT NULL
+  AND json_extract(json_value, '$.conversationId') IS NOT NULL""",
+    'playerDescriptions': """json_extract(json_value, '$.name') IS NOT NULL
+  AND json_extract(json_value, '$.playerId') IS NOT NULL
+  AND json_extract(json_value, '$.worldId') IS NOT NULL""",
+}
+
+# The same table shapes as bare field names, for the hyperscan prefilter.
+_TABLE_FIELDS = {
+    'memories': ('importance', 'description', 'playerId'),
+    'memoryEmbeddings': ('embedding', 'playerId'),
+    'messages': ('text', 'author', 'conversationId'),
+    'playerDescriptions': ('name', 'playerId', 'worldId'),
+}
+
+# Resolved table_id BLOBs, cached per logical table for the process.
+_TABLE_ID_CACHE: Dict[str, bytes] = {}
+
+# Compiled hyperscan literal databases, keyed by needle tuple.
+_HS_DBS: Dict[tuple, Any] = {}
+
+
+def _multi_contains(value, *needles):
+    """SQL function: 1 if every needle substring occurs in value.
+
+    Backed by a compiled hyperscan literal database, which scans dozens of
+    bytes per vector instruction versus SQLite's scalar LIKE loop. Used as
+    a cheap prefilter ahead of json_extract in the table_id discovery
+    probes and the full-scan fallback queries, so rows from other tables
+    are rejected without a JSON parse.
+    """
+    if value is None:
+        return 0
+    data = value if isinstance(value, bytes) else str(value).encode()
+    db = _HS_DBS.get(needles)
+    if db is None:
+        db = hyperscan.Database()
+        # python-hyperscan exposes literal compilation as a kwarg, not an
+        # HS_FLAG_* flag.
+        db.compile(
+            expressions=[n.encode() for n in needles],
+            ids=list(range(len(needles))),
+            literal=True,
+        )
+        _HS_DBS[needles] = db
+    hits = set()
+    db.scan(data, match_event_handler=lambda mid, s, e, flags, ctx: hits.add(mid))
+    return 1 if len(hits) == len(needles) else 0
+
+
+def _prefilter(table: str) -> str:
+    """SQL fragment prefiltering a JSON-text scan for a table's field
+    names via multi_contains; empty when hyperscan is unavailable."""
+    if hyperscan is None:
+        return ""
+    needles = ", ".join(f"'\"{f}\"'" for f in _TABLE_FIELDS[table])
+    return f"multi_contains(json_value, {needles}) AND "
+
+
+# SQL templates are module-level constants: sqlite3 caches prepared
+# statements per connection keyed on the exact SQL text, so reusing the
+# same string object skips re-parsing and re-planning the query. Each
+# query has a table_id variant (index range scan) and a json_extract
+# fallback (full scan with pushed-down predicates, prefixed with the
+# multi_contains prefilter when hyperscan is available at import time).
+_MEMORIES_SELECT = """
+SELECT id,
+       json_extract(json_value, '$.playerId'),
+       json_extract(json_value, '$.description'),
+       json_extract(json_value, '$.importance'),
+       json_extract(json_value, '$.lastAccess'),
+       json_extract(json_value, '$.embeddingId'),
+       json_extract(json_value, '$.data.type'),
+       ts
+FROM documents
+WHERE deleted = 0
+"""
+_MEMORIES_QUERY = (
+    f"{_MEMORIES_SELECT}"
+    f"  AND {_prefilter('memories')}{_TABLE_PREDICATES['memories']}\n"
+    f"ORDER BY ts DESC"
+)
+_MEMORIES_TID_QUERY = f"{_MEMORIES_SELECT}  AND table_id = ?\nORDER BY ts DESC"
+# Per-player probe: once create_indexes has built idx_mem_pid this is an
+# O(log N) B-tree lookup instead of a rescan of the whole memories table.
+_MEMORIES_BY_PLAYER_QUERY = (
+    f"{_MEMORIES_SELECT}"
+    f"  AND json_extract(json_value, '$.playerId') = ?\n"
+    f"  AND json_extract(json_value, '$.importance') IS NOT NULL\n"
+    f"ORDER BY ts DESC"
+)
+
+_EMBEDDINGS_SELECT = """
+SELECT id, json(json_value)
+FROM documents
+WHERE deleted = 0
+"""
+_EMBEDDINGS_QUERY = (
+    f"{_EMBEDDINGS_SELECT}"
+    f"  AND {_prefilter('memoryEmbeddings')}{_TABLE_PREDICATES['memoryEmbeddings']}"
+)
+_EMBEDDINGS_TID_QUERY = f"{_EMBEDDINGS_SELECT}  AND table_id = ?"
+
+_MESSAGES_SELECT = """
+SELECT id, json(json_value), ts
+FROM documents
+WHERE deleted = 0
+"""
+_MESSAGES_QUERY = (
+    f"{_MESSAGES_SELECT}"
+    f"  AND {_prefilter('messages')}{_TABLE_PREDICATES['messages']}\n"
+    f"ORDER BY ts DESC"
+)
+_MESSAGES_TID_QUERY = f"{_MESSAGES_SELECT}  AND table_id = ?\nORDER BY ts DESC"
+
+_PLAYERS_SELECT = """
+SELECT id, json(json_value)
+FROM documents
+WHERE deleted = 0
+"""
+_PLAYERS_QUERY = (
+    f"{_PLAYERS_SELECT}"
+    f"  AND {_prefilter('playerDescriptions')}{_TABLE_PREDICATES['playerDescriptions']}\n"
+    f"LIMIT 50"
+)
+_PLAYERS_TID_QUERY = f"{_PLAYERS_SELECT}  AND table_id = ?\nLIMIT 50"
+
+
+def _hex_ids(raw_ids):
+    """Convert collected raw document ids to hex strings in one batch
+    pass, instead of a Python-level .hex() call inside the row loop."""
+    return [binascii.hexlify(b).decode() if isinstance(b, bytes) else str(b)
+            for b in raw_ids]
+
+
+def _iter_rows(cursor, batch_size: int = 1000):
+    """Stream rows in fetchmany batches so the result set is never fully
+    materialized; memory stays O(batch_size) instead of O(rows)."""
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        yield from batch
+
+
+def _at(doc, pointer, default=None):
+    """Read one field from a lazy simdjson document via JSON Pointer,
+    without materializing the rest of the document."""
+    try:
+        return doc.at_pointer(pointer)
+    except (KeyError, TypeError):
+        return default
+
 
 def connect_db():
     """Connect to the SQLite database."""
-    return sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH)
+    # Scan-friendly settings, applied once per connection: a bigger page
+    # cache, mmap'd reads (no read() syscalls on the scan path), in-memory
+    # temp structures, and WAL so readers don't block the Convex writer.
+    conn.execute("PRAGMA cache_size = -65536")
+    conn.execute("PRAGMA mmap_size = 1073741824")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA journal_mode = WAL")
+    if hyperscan is not None:
+        conn.create_function('multi_contains', -1, _multi_contains,
+                             deterministic=True)
+    return conn
+
+
+def create_indexes(conn):
+    """
+    One-time, opt-in creation of the idx_mem_pid expression index, so
+    playerId filters become a B-tree probe instead of a full scan of
+    every document's JSON text.
+
+    Not run automatically: this is write DDL against a database the
+    Convex backend owns, and issuing it from every connection would let
+    concurrent connections race the index build. Run it once against a
+    copy you own; all queries work (just slower) without the index.
+    """
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_mem_pid "
+        "ON documents(json_extract(json_value, '$.playerId')) "
+        "WHERE deleted = 0"
+    )
+    conn.commit()
+    print("Created idx_mem_pid expression index.")
+
+
+def migrate_to_jsonb(conn):
+    """
+    One-time, opt-in migration of the json_value column to SQLite's JSONB
+    (pre-parsed BLOB) format, so json_extract no longer re-tokenizes the
+    JSON text on every access.
+
+    Requires SQLite >= 3.45. Not run automatically: the Convex backend
+    writes this database too, so only migrate a copy you own. All queries
+    in this script read via json(json_value) and work with either format.
+    """
+    if sqlite3.sqlite_version_info < (3, 45, 0):
+        raise RuntimeError(
+            f"JSONB requires SQLite >= 3.45 (found {sqlite3.sqlite_version})"
+        )
+    conn.execute(
+        "UPDATE documents SET json_value = jsonb(json_value) "
+        "WHERE typeof(json_value) = 'text'"
+    )
+    conn.commit()
+    print("Migrated json_value column to JSONB.")
+
+
+def get_table_id(conn, table: str):
+    """
+    Resolve the table_id BLOB Convex uses for a logical table.
+
+    Discovered by grabbing one row matching the table's shape predicates,
+    then cached for the process, so every later query can filter
+    WHERE table_id = ? -- an index range scan over just that table's rows
+    instead of json_extract predicates across the whole documents table.
+    Returns None if no row matches (caller falls back to the predicates).
+    """
+    if table not in _TABLE_ID_CACHE:
+        row = conn.execute(
+            f"SELECT table_id FROM documents WHERE deleted = 0 "
+            f"AND {_prefilter(table)}{_TABLE_PREDICATES[table]} LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        _TABLE_ID_CACHE[table] = row[0]
+    return _TABLE_ID_CACHE[table]
 
 
 def get_table_names(conn):
@@ -41,176 +291,345 @@ def inspect_table_schema(conn, table_name: str):
     return columns
 
 
+def _memories_frame(cursor) -> pd.DataFrame:
+    """Drain an executed memories query into a columnwise DataFrame."""
+    # One list per column (SoA) so pandas gets contiguous, pre-typed columns
+    # instead of inferring dtypes from a list of per-row dicts.
+    ids = []
+    pids = []
+    descs = []
+    imps = array.array('f')  # typed buffer; becomes the float32 column as-is
+    last_accesses = []
+    embedding_ids = []
+    data_types = []
+    ts_arr = []
+
+    for (doc_id, player_id, description, importance, last_access,
+         embedding_id, data_type, ts) in _iter_rows(cursor):
+        ids.append(doc_id)
+        pids.append(player_id)
+        descs.append(description)
+        # The table_id query path carries no importance IS NOT NULL
+        # predicate, so map missing values to NaN for the float32 column.
+        imps.append(importance if importance is not None else float('nan'))
+        last_accesses.append(last_access)
+        embedding_ids.append(embedding_id)
+        data_types.append(data_type)
+        ts_arr.append(ts)
+
+    if not ids:
+        return pd.DataFrame()
+
+    n = len(ids)
+    df = pd.DataFrame({
+        '_id': _hex_ids(ids),
+        'playerId': pids,
+        'description': descs,
+        'importance': np.frombuffer(imps, dtype=np.float32),
+        'lastAccess': last_accesses,
+        'embeddingId': embedding_ids,
+        'data_type': data_types,
+        'ts': np.fromiter(ts_arr, dtype=np.int64, count=n),
+    })
+
+    # Human-readable timestamp in one vectorized pass (NumPy datetime64
+    # kernel) instead of a datetime.fromtimestamp call per row.
+    df['lastAccess_readable'] = pd.to_datetime(
+        df['lastAccess'], unit='ms', errors='coerce'
+    ).dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    return df
+
+
 def get_all_memories(conn) -> pd.DataFrame:
     """
     Retrieve all memories from the database.
     Convex stores data in JSON format in the documents table.
     """
     cursor = conn.cursor()
-    
-    # Convex uses table_id (BLOB) to identify table, but we can check json_value content
-    # We look for documents with memory-specific fields
-    query = """
-    SELECT id, json_value, ts
-    FROM documents 
-    WHERE deleted = 0
-      AND json_value LIKE '%"importance"%'
-      AND json_value LIKE '%"description"%'
-      AND json_value LIKE '%"playerId"%'
-    ORDER BY ts DESC
-    """
-    
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    
-    memories = []
-    for row in rows:
-        doc_id, value_json, ts = row
-        try:
-            value = json.loads(value_json)
-            memory = {
-                '_id': doc_id.hex() if isinstance(doc_id, bytes) else str(doc_id),
-                'playerId': value.get('playerId'),
-                'description': value.get('description'),
-                'importance': value.get('importance'),
-                'lastAccess': value.get('lastAccess'),
-                'embeddingId': value.get('embeddingId'),
-                'data': value.get('data', {}),
-                'data_type': value.get('data', {}).get('type'),
-                'ts': ts,
-            }
-            
-            # Add human-readable timestamp
-            if memory['lastAccess']:
-                memory['lastAccess_readable'] = datetime.fromtimestamp(
-                    memory['lastAccess'] / 1000
-                ).strftime('%Y-%m-%d %H:%M:%S')
-            
-            memories.append(memory)
-        except json.JSONDecodeError as e:
-            print(f"Error parsing memory {doc_id}: {e}")
-            continue
-    
-    return pd.DataFrame(memories) if memories else pd.DataFrame()
+
+    # Convex keys documents by table_id (BLOB); filtering on it turns the
+    # full-table scan into an index range scan over just the memories rows.
+    # json_extract still projects the columns we need, so each document's
+    # JSON is decoded exactly once, on the SQL side; the nested data object
+    # comes back as a small JSON subdocument.
+    tid = get_table_id(conn, 'memories')
+    if tid is not None:
+        cursor.execute(_MEMORIES_TID_QUERY, (tid,))
+    else:
+        cursor.execute(_MEMORIES_QUERY)
+
+    return _memories_frame(cursor)
 
 
 def get_memories_by_player(conn, player_id: str) -> pd.DataFrame:
     """Get all memories for a specific player."""
-    df = get_all_memories(conn)
-    if not df.empty:
-        return df[df['playerId'] == player_id]
-    return df
+    # Push the filter into SQL: the expression index on playerId makes this
+    # a B-tree probe, rather than rescanning the whole table and filtering
+    # the resulting DataFrame in pandas.
+    cursor = conn.cursor()
+    cursor.execute(_MEMORIES_BY_PLAYER_QUERY, (player_id,))
+    return _memories_frame(cursor)
 
 
-def get_memory_embeddings(conn) -> pd.DataFrame:
-    """Retrieve memory embeddings."""
-    cursor = conn.cursor()
-    
-    query = """
-    SELECT id, json_value 
-    FROM documents 
-    WHERE deleted = 0
-      AND json_value LIKE '%"embedding"%'
-      AND json_value LIKE '%"playerId"%'
+def get_memory_embeddings(conn, with_vectors: bool = False) -> pd.DataFrame:
     """
+    Retrieve memory embeddings.
+
+    By default only playerId and the vector length are extracted; the big
+    float arrays stay unparsed on the simdjson tape. Pass with_vectors=True
+    to materialize the vectors themselves.
+    """
+    cursor = conn.cursor()
     
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    
+    tid = get_table_id(conn, 'memoryEmbeddings')
+    if tid is not None:
+        cursor.execute(_EMBEDDINGS_TID_QUERY, (tid,))
+    else:
+        cursor.execute(_EMBEDDINGS_QUERY)
+
+    # One parser per call, reused across this loop's rows (simdjson keeps
+    # its tape alive between parses). Parser instances are not thread-safe,
+    # and main() runs the retrievals concurrently, so it must not be a
+    # module global.
+    parser = simdjson.Parser()
+    raw_ids = []
     embeddings = []
-    for row in rows:
+    for row in _iter_rows(cursor):
         doc_id, value_json = row
         try:
-            value = json.loads(value_json)
+            doc = parser.parse(value_json)
             # Check if it's an embedding document (has embedding array)
-            if 'embedding' in value and isinstance(value['embedding'], list):
+            embedding = _at(doc, '/embedding')
+            if embedding is not None:
                 embedding_data = {
-                    '_id': doc_id.hex() if isinstance(doc_id, bytes) else str(doc_id),
-                    'playerId': value.get('playerId'),
-                    'embedding': value.get('embedding'),
-                    'embedding_length': len(value.get('embedding', [])),
+                    'playerId': _at(doc, '/playerId'),
+                    'embedding_length': len(embedding),
                 }
+                if with_vectors:
+                    embedding_data['embedding'] = embedding.as_list()
+                raw_ids.append(doc_id)
                 embeddings.append(embedding_data)
-        except json.JSONDecodeError as e:
+        except ValueError as e:
             print(f"Error parsing embedding {doc_id}: {e}")
             continue
-    
-    return pd.DataFrame(embeddings) if embeddings else pd.DataFrame()
+        finally:
+            # Drop the proxies before the next parse: simdjson refuses to
+            # re-use the parser while objects still reference its tape.
+            doc = embedding = None
+
+    if not embeddings:
+        return pd.DataFrame()
+    df = pd.DataFrame(embeddings)
+    df.insert(0, '_id', _hex_ids(raw_ids))
+    return df
 
 
 def get_messages(conn) -> pd.DataFrame:
     """Retrieve all conversation messages."""
     cursor = conn.cursor()
     
-    query = """
-    SELECT id, json_value, ts
-    FROM documents 
-    WHERE deleted = 0
-      AND json_value LIKE '%"text"%'
-      AND json_value LIKE '%"author"%'
-      AND json_value LIKE '%"conversationId"%'
-    ORDER BY ts DESC
-    """
-    
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    
+    tid = get_table_id(conn, 'messages')
+    if tid is not None:
+        cursor.execute(_MESSAGES_TID_QUERY, (tid,))
+    else:
+        cursor.execute(_MESSAGES_QUERY)
+
+    # Per-call parser; see get_memory_embeddings.
+    parser = simdjson.Parser()
+    raw_ids = []
     messages = []
-    for row in rows:
+    for row in _iter_rows(cursor):
         doc_id, value_json, ts = row
         try:
-            value = json.loads(value_json)
+            doc = parser.parse(value_json)
             messages.append({
-                '_id': doc_id.hex() if isinstance(doc_id, bytes) else str(doc_id),
-                'conversationId': value.get('conversationId'),
-                'author': value.get('author'),
-                'text': value.get('text'),
-                'messageUuid': value.get('messageUuid'),
+                'conversationId': _at(doc, '/conversationId'),
+                'author': _at(doc, '/author'),
+                'text': _at(doc, '/text'),
+                'messageUuid': _at(doc, '/messageUuid'),
                 'ts': ts,
             })
-        except json.JSONDecodeError as e:
+            raw_ids.append(doc_id)
+        except ValueError as e:
             print(f"Error parsing message {doc_id}: {e}")
             continue
-    
-    return pd.DataFrame(messages) if messages else pd.DataFrame()
+        finally:
+            # Drop the proxy before the next parse: simdjson refuses to
+            # re-use the parser while objects still reference its tape.
+            doc = None
+
+    if not messages:
+        return pd.DataFrame()
+    df = pd.DataFrame(messages)
+    df.insert(0, '_id', _hex_ids(raw_ids))
+    return df
 
 
 def get_player_descriptions(conn) -> pd.DataFrame:
     """Get player descriptions/names."""
     cursor = conn.cursor()
     
-    query = """
-    SELECT id, json_value 
-    FROM documents 
-    WHERE deleted = 0
-      AND json_value LIKE '%"name"%'
-      AND json_value LIKE '%"playerId"%'
-      AND json_value LIKE '%"worldId"%'
-    LIMIT 50
-    """
-    
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    
+    tid = get_table_id(conn, 'playerDescriptions')
+    if tid is not None:
+        cursor.execute(_PLAYERS_TID_QUERY, (tid,))
+    else:
+        cursor.execute(_PLAYERS_QUERY)
+
+    # Per-call parser; see get_memory_embeddings.
+    parser = simdjson.Parser()
+    raw_ids = []
     players = []
-    for row in rows:
+    for row in _iter_rows(cursor):
         doc_id, value_json = row
         try:
-            value = json.loads(value_json)
+            doc = parser.parse(value_json)
             # Check if this is a player description (has name and playerId)
-            if 'name' in value and 'playerId' in value and 'character' in value:
+            name = _at(doc, '/name')
+            player_id = _at(doc, '/playerId')
+            character = _at(doc, '/character')
+            if name is not None and player_id is not None and character is not None:
                 players.append({
-                    '_id': doc_id.hex() if isinstance(doc_id, bytes) else str(doc_id),
-                    'playerId': value.get('playerId'),
-                    'name': value.get('name'),
-                    'description': value.get('description'),
-                    'character': value.get('character'),
+                    'playerId': player_id,
+                    'name': name,
+                    'description': _at(doc, '/description'),
+                    'character': character,
                 })
-        except json.JSONDecodeError as e:
+                raw_ids.append(doc_id)
+        except ValueError as e:
             print(f"Error parsing player {doc_id}: {e}")
             continue
-    
-    return pd.DataFrame(players) if players else pd.DataFrame()
+        finally:
+            # Drop the proxy before the next parse: simdjson refuses to
+            # re-use the parser while objects still reference its tape.
+            doc = None
+
+    if not players:
+        return pd.DataFrame()
+    df = pd.DataFrame(players)
+    df.insert(0, '_id', _hex_ids(raw_ids))
+    return df
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _dot_scores(E, q):
+    """Dot product of every row of E against q, parallel over rows; the
+    inner loop vectorizes to SIMD FMAs."""
+    n, d = E.shape
+    scores = np.empty(n, dtype=np.float32)
+    for i in prange(n):
+        s = np.float32(0.0)
+        for j in range(d):
+            s += E[i, j] * q[j]
+        scores[i] = s
+    return scores
+
+
+def build_embedding_matrix(embeddings_df: pd.DataFrame) -> np.ndarray:
+    """
+    Stack the embedding vectors from get_memory_embeddings(conn,
+    with_vectors=True) into one contiguous, row-normalized float32 matrix,
+    so cosine similarity reduces to a dot product.
+    """
+    E = np.ascontiguousarray(
+        np.stack(embeddings_df['embedding'].to_list()), dtype=np.float32
+    )
+    norms = np.linalg.norm(E, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return E / norms
+
+
+def top_k_similar(query_embedding, E: np.ndarray, k: int = 10) -> np.ndarray:
+    """Row indices of the k most cosine-similar embeddings in E (built by
+    build_embedding_matrix), most similar first."""
+    q = np.asarray(query_embedding, dtype=np.float32)
+    norm = np.linalg.norm(q)
+    if norm:
+        q = q / norm
+    scores = _dot_scores(E, q)
+    k = min(k, scores.shape[0])
+    # Partial selection of the top k, then order just those k.
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def quantize_embeddings(E: np.ndarray):
+    """
+    Quantize a row-normalized embedding matrix to int8 with one scale per
+    vector. Similarity scans are memory-bandwidth bound, so moving a
+    quarter of the bytes matters more than the small precision loss.
+    Returns (Q, scales).
+    """
+    scales = np.abs(E).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    Q = np.round(E / scales[:, None]).astype(np.int8)
+    return Q, scales.astype(np.float32)
+
+
+def top_k_similar_quantized(query_embedding, Q: np.ndarray,
+                            scales: np.ndarray, k: int = 10) -> np.ndarray:
+    """Like top_k_similar, but over an int8 matrix from
+    quantize_embeddings; integer dot products, rescaled afterwards."""
+    q = np.asarray(query_embedding, dtype=np.float32)
+    norm = np.linalg.norm(q)
+    if norm:
+        q = q / norm
+    q_scale = np.abs(q).max() / 127.0
+    if q_scale == 0:
+        q_scale = 1.0
+    q_int8 = np.round(q / q_scale).astype(np.int8)
+    raw = Q.astype(np.int32) @ q_int8.astype(np.int32)
+    scores = raw.astype(np.float32) * (scales * np.float32(q_scale))
+    k = min(k, scores.shape[0])
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def build_search_index(conn):
+    """
+    Build (or rebuild) an FTS5 full-text index over memory descriptions.
+
+    One-time O(N) pass; afterwards keyword queries via search_memories run
+    against the inverted index instead of scanning the documents table.
+    """
+    conn.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS mem_fts USING fts5("
+        "playerId UNINDEXED, description, "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    conn.execute("DELETE FROM mem_fts")
+    populate = (
+        "INSERT INTO mem_fts (playerId, description) "
+        "SELECT json_extract(json_value, '$.playerId'), "
+        "       json_extract(json_value, '$.description') "
+        "FROM documents WHERE deleted = 0 AND "
+    )
+    tid = get_table_id(conn, 'memories')
+    if tid is not None:
+        conn.execute(populate + "table_id = ?", (tid,))
+    else:
+        conn.execute(populate + _TABLE_PREDICATES['memories'])
+    conn.commit()
+
+
+def search_memories(conn, query: str, limit: int = 20) -> pd.DataFrame:
+    """Keyword-search memory descriptions via the FTS5 index, best
+    (lowest) bm25 rank first. Call build_search_index first."""
+    # Quote each token (doubling embedded quotes) so user text is matched
+    # literally; apostrophes, hyphens, and stray quotes would otherwise be
+    # parsed as FTS5 query syntax and raise OperationalError.
+    match = ' '.join('"%s"' % token.replace('"', '""')
+                     for token in query.split())
+    if not match:
+        return pd.DataFrame(columns=['playerId', 'description', 'rank'])
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT playerId, description, bm25(mem_fts) AS rank "
+        "FROM mem_fts WHERE mem_fts MATCH ? ORDER BY rank LIMIT ?",
+        (match, limit),
+    )
+    return pd.DataFrame(cursor.fetchall(),
+                        columns=['playerId', 'description', 'rank'])
 
 
 def analyze_memories(memories_df: pd.DataFrame):
@@ -224,27 +643,44 @@ def analyze_memories(memories_df: pd.DataFrame):
     print("=" * 60)
     
     print(f"\nTotal memories: {len(memories_df)}")
-    
+
+    # These are one-shot scalar aggregates; Counter and raw NumPy
+    # reductions skip the Series/BlockManager machinery pandas wraps
+    # around value_counts/mean/min/max.
     if 'data_type' in memories_df.columns:
         print("\nMemories by type:")
-        print(memories_df['data_type'].value_counts())
-    
+        for data_type, count in Counter(memories_df['data_type']).most_common():
+            print(f"  {data_type}: {count}")
+
     if 'importance' in memories_df.columns:
+        importance = memories_df['importance'].to_numpy()
+        # nan-aware reductions: rows without importance are NaN in the
+        # column and must not poison the stats.
         print(f"\nImportance statistics:")
-        print(f"  Mean: {memories_df['importance'].mean():.2f}")
-        print(f"  Min: {memories_df['importance'].min():.2f}")
-        print(f"  Max: {memories_df['importance'].max():.2f}")
-    
+        print(f"  Mean: {np.nanmean(importance):.2f}")
+        print(f"  Min: {np.nanmin(importance):.2f}")
+        print(f"  Max: {np.nanmax(importance):.2f}")
+
     if 'playerId' in memories_df.columns:
         print(f"\nMemories per player:")
-        player_counts = memories_df['playerId'].value_counts()
-        for player_id, count in player_counts.head(10).items():
+        for player_id, count in Counter(memories_df['playerId']).most_common(10):
             print(f"  {player_id}: {count} memories")
 
 
 def export_to_json(df: pd.DataFrame, filename: str):
     """Export DataFrame to JSON file."""
-    df.to_json(filename, orient='records', indent=2)
+    # Encode record-by-record with orjson instead of df.to_json, which
+    # builds the entire indented document in RAM before writing; peak
+    # memory stays at one record.
+    cols = df.columns.tolist()
+    opts = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+    with open(filename, 'wb') as f:
+        f.write(b'[')
+        for i, row in enumerate(df.itertuples(index=False, name=None)):
+            if i:
+                f.write(b',\n')
+            f.write(orjson.dumps(dict(zip(cols, row)), default=str, option=opts))
+        f.write(b']')
     print(f"\nExported to {filename}")
 
 
@@ -254,36 +690,57 @@ def export_to_csv(df: pd.DataFrame, filename: str):
     print(f"\nExported to {filename}")
 
 
+def _fetch(retriever, *args):
+    """Run one retrieval function on its own connection (sqlite3
+    connections must not be shared across threads)."""
+    conn = connect_db()
+    try:
+        return retriever(conn, *args)
+    finally:
+        conn.close()
+
+
 def main():
     """Main function to demonstrate usage."""
     print("Connecting to AI Town database...")
     conn = connect_db()
-    
+
     try:
         # Show available tables
         print("\n=== Available Tables ===")
         tables = get_table_names(conn)
         for table in tables:
             print(f"  - {table}")
-        
+
         # Inspect documents table structure
         if 'documents' in tables:
             inspect_table_schema(conn, 'documents')
-        
-        # Get player descriptions
+
+        # The four retrievals are independent reads; with WAL they can run
+        # concurrently, each on its own connection, overlapping SQLite I/O
+        # while only the Python-side decoding serializes through the GIL.
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            fut_players = executor.submit(_fetch, get_player_descriptions)
+            fut_memories = executor.submit(_fetch, get_all_memories)
+            fut_messages = executor.submit(_fetch, get_messages)
+            fut_embeddings = executor.submit(_fetch, get_memory_embeddings)
+            players_df = fut_players.result()
+            memories_df = fut_memories.result()
+            messages_df = fut_messages.result()
+            embeddings_df = fut_embeddings.result()
+
+        # Show player descriptions
         print("\n" + "=" * 60)
         print("PLAYER DESCRIPTIONS")
         print("=" * 60)
-        players_df = get_player_descriptions(conn)
         if not players_df.empty:
             print(players_df[['playerId', 'name']].to_string(index=False))
-        
-        # Retrieve all memories
+
+        # Show memories
         print("\n" + "=" * 60)
         print("RETRIEVING MEMORIES")
         print("=" * 60)
-        memories_df = get_all_memories(conn)
-        
+
         if not memories_df.empty:
             print(f"\nFound {len(memories_df)} memories")
             
@@ -295,7 +752,17 @@ def main():
             
             # Analyze memories
             analyze_memories(memories_df)
-            
+
+            # Full-text search over descriptions
+            search_term = input("\n\nSearch memories (keyword, or blank to skip): ").strip()
+            if search_term:
+                build_search_index(conn)
+                results = search_memories(conn, search_term)
+                if not results.empty:
+                    print(results[['playerId', 'description']].to_string(index=False))
+                else:
+                    print("No matches.")
+
             # Export options
             export_choice = input("\n\nExport memories? (json/csv/no): ").lower()
             if export_choice == 'json':
@@ -305,21 +772,19 @@ def main():
         else:
             print("No memories found in database.")
         
-        # Get messages
+        # Show messages
         print("\n" + "=" * 60)
         print("MESSAGES")
         print("=" * 60)
-        messages_df = get_messages(conn)
         if not messages_df.empty:
             print(f"\nFound {len(messages_df)} messages")
             print("\n=== Sample Messages (first 5) ===")
             print(messages_df[['author', 'text']].head().to_string(index=False))
         
-        # Get embeddings info
+        # Show embeddings info
         print("\n" + "=" * 60)
         print("EMBEDDINGS")
         print("=" * 60)
-        embeddings_df = get_memory_embeddings(conn)
         if not embeddings_df.empty:
             print(f"\nFound {len(embeddings_df)} embeddings")
             print(f"Embedding dimensions: {embeddings_df['embedding_length'].iloc[0]}")
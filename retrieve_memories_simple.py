@@ -3,37 +3,98 @@ Simple script to retrieve agent memories from AI Town SQLite database.
 No external dependencies required - uses only Python standard library.
 """
 
+import array
+import heapq
 import sqlite3
 import json
+from collections import Counter
 from datetime import datetime
+from statistics import fmean
 
 DB_PATH = "convex_local_backend.sqlite3"
 
+# Shared sentinel so rows without a data field don't allocate a fresh
+# empty dict each.
+_EMPTY = {}
+
+# Module-level SQL constants: sqlite3 caches prepared statements per
+# connection keyed on the exact SQL text, so reuse skips re-parse/re-plan.
+_MEMORIES_QUERY = """
+SELECT id, json(json_value), ts
+FROM documents
+WHERE deleted = 0
+  AND json_extract(json_value, '$.importance') IS NOT NULL
+  AND json_extract(json_value, '$.description') IS NOT NULL
+  AND json_extract(json_value, '$.playerId') IS NOT NULL
+ORDER BY ts DESC
+"""
+
+_PLAYERS_QUERY = """
+SELECT id, json(json_value)
+FROM documents
+WHERE deleted = 0
+  AND json_extract(json_value, '$.name') IS NOT NULL
+  AND json_extract(json_value, '$.playerId') IS NOT NULL
+  AND json_extract(json_value, '$.character') IS NOT NULL
+LIMIT 50
+"""
+
+_MESSAGES_QUERY = """
+SELECT id, json(json_value), ts
+FROM documents
+WHERE deleted = 0
+  AND json_extract(json_value, '$.text') IS NOT NULL
+  AND json_extract(json_value, '$.author') IS NOT NULL
+  AND json_extract(json_value, '$.conversationId') IS NOT NULL
+ORDER BY ts DESC
+LIMIT 100
+"""
+
+
+def _iter_rows(cursor, batch_size=1000):
+    """Stream rows in fetchmany batches so results are never fully
+    materialized; memory stays bounded by the batch size."""
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        yield from batch
+
 
 def connect_db():
     """Connect to the SQLite database."""
-    return sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH)
+    # Scan-friendly settings: bigger page cache, mmap'd reads, in-memory
+    # temp structures, and WAL so reads don't block the Convex writer.
+    conn.execute("PRAGMA cache_size = -65536")
+    conn.execute("PRAGMA mmap_size = 1073741824")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
+
+
+def create_indexes(conn):
+    """One-time, opt-in creation of the idx_mem_pid expression index, so
+    playerId filters probe a B-tree instead of scanning every document's
+    JSON text. Not run automatically: it is write DDL against a database
+    the Convex backend owns. All queries work (just slower) without it."""
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_mem_pid "
+        "ON documents(json_extract(json_value, '$.playerId')) "
+        "WHERE deleted = 0"
+    )
+    conn.commit()
+    print("Created idx_mem_pid expression index.")
 
 
 def get_all_memories(conn):
     """Retrieve all memories from the database."""
     cursor = conn.cursor()
     
-    query = """
-    SELECT id, json_value, ts
-    FROM documents 
-    WHERE deleted = 0
-      AND json_value LIKE '%"importance"%'
-      AND json_value LIKE '%"description"%'
-      AND json_value LIKE '%"playerId"%'
-    ORDER BY ts DESC
-    """
-    
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    
+    cursor.execute(_MEMORIES_QUERY)
+
     memories = []
-    for doc_id, value_json, ts in rows:
+    for doc_id, value_json, ts in _iter_rows(cursor):
         try:
             value = json.loads(value_json)
             memory = {
@@ -42,7 +103,7 @@ def get_all_memories(conn):
                 'description': value.get('description'),
                 'importance': value.get('importance'),
                 'lastAccess': value.get('lastAccess'),
-                'data_type': value.get('data', {}).get('type'),
+                'data_type': (value.get('data') or _EMPTY).get('type'),
                 'ts': ts,
             }
             
@@ -66,21 +127,10 @@ def get_player_descriptions(conn):
     """Get player names and descriptions."""
     cursor = conn.cursor()
     
-    query = """
-    SELECT id, json_value 
-    FROM documents 
-    WHERE deleted = 0
-      AND json_value LIKE '%"name"%'
-      AND json_value LIKE '%"playerId"%'
-      AND json_value LIKE '%"character"%'
-    LIMIT 50
-    """
-    
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    
+    cursor.execute(_PLAYERS_QUERY)
+
     players = []
-    for doc_id, value_json in rows:
+    for doc_id, value_json in _iter_rows(cursor):
         try:
             value = json.loads(value_json)
             if 'name' in value and 'playerId' in value and 'character' in value:
@@ -101,22 +151,10 @@ def get_messages(conn):
     """Retrieve conversation messages."""
     cursor = conn.cursor()
     
-    query = """
-    SELECT id, json_value, ts
-    FROM documents 
-    WHERE deleted = 0
-      AND json_value LIKE '%"text"%'
-      AND json_value LIKE '%"author"%'
-      AND json_value LIKE '%"conversationId"%'
-    ORDER BY ts DESC
-    LIMIT 100
-    """
-    
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    
+    cursor.execute(_MESSAGES_QUERY)
+
     messages = []
-    for doc_id, value_json, ts in rows:
+    for doc_id, value_json, ts in _iter_rows(cursor):
         try:
             value = json.loads(value_json)
             messages.append({
@@ -167,28 +205,38 @@ def main():
         print(f"\nFound {len(memories)} memories")
         
         if memories:
-            # Show memory statistics
-            memory_types = {}
-            for mem in memories:
-                mem_type = mem.get('data_type', 'unknown')
-                memory_types[mem_type] = memory_types.get(mem_type, 0) + 1
-            
+            # One pass over the memories: tally the types, collect the
+            # importances into a typed float buffer, and keep a fixed-size
+            # top-5 heap -- instead of three separate O(N) walks plus a
+            # full sort for the samples.
+            memory_types = Counter()
+            importances = array.array('f')
+            top_heap = []
+            for idx, mem in enumerate(memories):
+                memory_types[mem.get('data_type', 'unknown')] += 1
+                if mem.get('importance'):
+                    importances.append(mem['importance'])
+                entry = (mem.get('importance') or 0, -idx)
+                if len(top_heap) < 5:
+                    heapq.heappush(top_heap, entry)
+                else:
+                    heapq.heappushpop(top_heap, entry)
+
             print("\nMemories by type:")
             for mem_type, count in memory_types.items():
                 print(f"  {mem_type}: {count}")
-            
-            # Show importance statistics
-            importances = [m['importance'] for m in memories if m.get('importance')]
+
+            # Show importance statistics (fmean does the reduction in C)
             if importances:
                 print(f"\nImportance statistics:")
-                print(f"  Mean: {sum(importances)/len(importances):.2f}")
+                print(f"  Mean: {fmean(importances):.2f}")
                 print(f"  Min: {min(importances):.2f}")
                 print(f"  Max: {max(importances):.2f}")
-            
+
             # Show sample memories
             print("\n--- Sample Memories (top 5 by importance) ---")
-            sorted_memories = sorted(memories, key=lambda x: x.get('importance', 0), reverse=True)
-            for i, mem in enumerate(sorted_memories[:5], 1):
+            top_memories = [memories[-idx] for _, idx in sorted(top_heap, reverse=True)]
+            for i, mem in enumerate(top_memories, 1):
                 print(f"\n{i}. Player: {mem['playerId'][:8]}...")
                 print(f"   Description: {mem['description'][:100]}...")
                 print(f"   Importance: {mem['importance']:.2f}")
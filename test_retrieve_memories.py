@@ -0,0 +1,246 @@
+"""
+Tests for retrieve_memories.py against a synthetic Convex-style database.
+
+Builds a small documents table with the same shape convex_local_backend
+uses (table_id BLOB, JSON text, ts, deleted) and runs the retrieval
+functions against it.
+"""
+
+import json
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import retrieve_memories as rm
+
+_MEM_TID = b'\x01'
+_MSG_TID = b'\x02'
+_PLY_TID = b'\x03'
+_EMB_TID = b'\x04'
+
+
+def _insert(conn, doc_id, table_id, value, ts):
+    conn.execute(
+        "INSERT INTO documents (id, table_id, json_value, ts, deleted) "
+        "VALUES (?, ?, ?, ?, 0)",
+        (doc_id, table_id, json.dumps(value), ts),
+    )
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    """A connection to a freshly built synthetic database."""
+    path = tmp_path / "convex_local_backend.sqlite3"
+    setup = sqlite3.connect(path)
+    setup.execute(
+        "CREATE TABLE documents "
+        "(id BLOB, table_id BLOB, json_value TEXT, ts INTEGER, deleted INTEGER)"
+    )
+    # Several rows per table: every loop must survive more than one row.
+    for i in range(6):
+        _insert(setup, bytes([10 + i]), _MEM_TID, {
+            'playerId': f'p:{i % 2}',
+            'description': f"memory {i} about alice's garden",
+            'importance': float(i),
+            'lastAccess': 1700000000000 + i,
+            'embeddingId': f'e:{i}',
+            'data': {'type': 'reflection' if i % 2 else 'conversation'},
+        }, 1000 + i)
+    for i in range(4):
+        _insert(setup, bytes([50 + i]), _MSG_TID, {
+            'conversationId': 'c:1',
+            'author': f'p:{i % 2}',
+            'text': f'hello {i}',
+            'messageUuid': str(i),
+        }, 2000 + i)
+    for i in range(3):
+        _insert(setup, bytes([80 + i]), _PLY_TID, {
+            'playerId': f'p:{i}',
+            'name': f'Agent{i}',
+            'worldId': 'w:1',
+            'character': f'f{i}',
+            'description': 'a synthetic agent',
+        }, 3000 + i)
+    for i in range(4):
+        _insert(setup, bytes([100 + i]), _EMB_TID, {
+            'playerId': f'p:{i % 2}',
+            'embedding': [0.1 * i, 0.2, 0.3],
+        }, 4000 + i)
+    setup.commit()
+    setup.close()
+
+    monkeypatch.setattr(rm, 'DB_PATH', str(path))
+    rm._TABLE_ID_CACHE.clear()
+    conn = rm.connect_db()
+    yield conn
+    conn.close()
+
+
+def test_get_all_memories(conn):
+    df = rm.get_all_memories(conn)
+    assert len(df) == 6
+    assert df['importance'].dtype == 'float32'
+    assert set(df['data_type']) == {'reflection', 'conversation'}
+
+
+def test_get_messages_multiple_rows(conn):
+    # Regression: the row loop must survive parsing more than one document.
+    df = rm.get_messages(conn)
+    assert len(df) == 4
+    assert set(df['text']) == {f'hello {i}' for i in range(4)}
+
+
+def test_get_player_descriptions_multiple_rows(conn):
+    df = rm.get_player_descriptions(conn)
+    assert len(df) == 3
+    assert sorted(df['name']) == ['Agent0', 'Agent1', 'Agent2']
+
+
+def test_get_memory_embeddings_multiple_rows(conn):
+    df = rm.get_memory_embeddings(conn)
+    assert len(df) == 4
+    assert 'embedding' not in df.columns
+    assert (df['embedding_length'] == 3).all()
+
+    df = rm.get_memory_embeddings(conn, with_vectors=True)
+    assert len(df) == 4
+    assert df['embedding'].iloc[0] == pytest.approx([0.0, 0.2, 0.3])
+
+
+def test_get_memories_by_player(conn):
+    df = rm.get_memories_by_player(conn, 'p:1')
+    assert len(df) == 3
+    assert (df['playerId'] == 'p:1').all()
+
+
+def test_create_indexes_is_opt_in(conn):
+    # Connecting must not issue write DDL against the Convex-owned
+    # database; the index only appears after the explicit setup call.
+    def index_names():
+        return {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+    assert 'idx_mem_pid' not in index_names()
+    rm.create_indexes(conn)
+    assert 'idx_mem_pid' in index_names()
+    # Queries behave the same with the index in place.
+    assert len(rm.get_memories_by_player(conn, 'p:1')) == 3
+
+
+@pytest.mark.skipif(rm.hyperscan is None, reason="hyperscan not installed")
+def test_multi_contains(conn):
+    assert rm._multi_contains('{"a": 1, "b": 2}', '"a"', '"b"') == 1
+    assert rm._multi_contains('{"a": 1}', '"a"', '"b"') == 0
+    assert rm._multi_contains(None, '"a"') == 0
+    # The discovery probe goes through the registered SQL function.
+    assert rm.get_table_id(conn, 'memories') == _MEM_TID
+
+
+def test_fallback_scan_queries(conn, monkeypatch):
+    # When no table_id can be resolved the retrievals fall back to full
+    # scans; those queries carry the multi_contains prefilter whenever
+    # hyperscan is importable, so they must run against a connect_db
+    # connection and return the same rows.
+    monkeypatch.setattr(rm, 'get_table_id', lambda c, t: None)
+    assert len(rm.get_all_memories(conn)) == 6
+    assert len(rm.get_messages(conn)) == 4
+    assert len(rm.get_player_descriptions(conn)) == 3
+    assert len(rm.get_memory_embeddings(conn)) == 4
+
+
+def test_concurrent_retrievals(conn, monkeypatch):
+    # Mirror main(): the four retrievals run on a thread pool, each with
+    # its own connection and its own parser.
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(rm._fetch, fn)
+            for fn in (rm.get_player_descriptions, rm.get_all_memories,
+                       rm.get_messages, rm.get_memory_embeddings)
+        ]
+        players, memories, messages, embeddings = [f.result() for f in futures]
+
+    assert len(players) == 3
+    assert len(memories) == 6
+    assert len(messages) == 4
+    assert len(embeddings) == 4
+
+
+def test_search_memories_escapes_fts_syntax(conn):
+    rm.build_search_index(conn)
+    # Apostrophes and quotes in user text must not be parsed as FTS5
+    # query syntax.
+    df = rm.search_memories(conn, "alice's")
+    assert len(df) == 6
+    assert rm.search_memories(conn, 'no"such"token').empty
+    assert rm.search_memories(conn, '   ').empty
+
+
+def test_memories_row_missing_importance(conn, capsys):
+    # The table_id query path applies no importance filter; a row without
+    # importance must become NaN, not abort the whole retrieval.
+    _insert(conn, bytes([200]), _MEM_TID, {
+        'playerId': 'p:0',
+        'description': 'memory with no importance',
+        'lastAccess': 1700000000100,
+        'data': {'type': 'reflection'},
+    }, 1100)
+    conn.commit()
+    df = rm.get_all_memories(conn)
+    assert len(df) == 7
+    assert df['importance'].isna().sum() == 1
+
+    # The NaN row must not poison the importance statistics either.
+    rm.analyze_memories(df)
+    out = capsys.readouterr().out
+    assert 'nan' not in out.lower()
+    assert 'Mean: 2.50' in out
+    assert 'Min: 0.00' in out
+    assert 'Max: 5.00' in out
+
+
+def _embedding_fixture(n=20, dim=8, seed=7):
+    """A row-normalized matrix from random vectors, plus a query."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'embedding': list(rng.normal(size=(n, dim)))})
+    return rm.build_embedding_matrix(df), rng.normal(size=dim)
+
+
+def test_build_embedding_matrix_normalizes():
+    E, _ = _embedding_fixture()
+    assert E.dtype == np.float32
+    assert np.linalg.norm(E, axis=1) == pytest.approx(np.ones(len(E)))
+    # A zero vector must pass through as zeros, not NaN.
+    df = pd.DataFrame({'embedding': [[0.0, 0.0], [3.0, 4.0]]})
+    E = rm.build_embedding_matrix(df)
+    assert (E[0] == 0).all()
+    assert E[1] == pytest.approx([0.6, 0.8])
+
+
+def test_top_k_similar_matches_reference():
+    E, q = _embedding_fixture()
+    ref = np.argsort(-(E @ (q / np.linalg.norm(q)).astype(np.float32)))
+    assert list(rm.top_k_similar(q, E, k=5)) == list(ref[:5])
+    # k larger than the row count clamps to all rows.
+    assert sorted(rm.top_k_similar(q, E, k=100)) == list(range(len(E)))
+    # A zero-norm query must not divide by zero.
+    assert len(rm.top_k_similar(np.zeros(E.shape[1]), E, k=3)) == 3
+
+
+def test_top_k_similar_quantized_agrees():
+    E, q = _embedding_fixture()
+    Q, scales = rm.quantize_embeddings(E)
+    assert Q.dtype == np.int8
+    assert scales.dtype == np.float32
+    # int8 quantization keeps well-separated neighbors in float order.
+    assert (list(rm.top_k_similar_quantized(q, Q, scales, k=5))
+            == list(rm.top_k_similar(q, E, k=5)))
+    assert sorted(rm.top_k_similar_quantized(q, Q, scales, k=100)) \
+        == list(range(len(E)))
+    # A zero row gets a unit scale instead of dividing by zero.
+    Q0, scales0 = rm.quantize_embeddings(np.zeros((2, 4), dtype=np.float32))
+    assert (Q0 == 0).all()
+    assert (scales0 == 1.0).all()